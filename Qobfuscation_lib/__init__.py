@@ -4,14 +4,35 @@
 Qobfuscation Library
 """
 
-# Make key classes and functions available at the package level
-from .circuit_obfuscator import CircuitObfuscator
-from .classical_obfuscator import obfuscate_file as obfuscate_classical_file
-from .quantum_engines import SmartNoiseGenerator, generate_deterministic_circuit
-from .utils import load_data_from_json, apply_gate_from_token, export_circuit_to_py
-from .code_splitter import IntelligentCodeSplitter
-from .identifier_manager import IdentifierManager
-from .decoy_generator import DecoyCodeGenerator
+import importlib
+
+# Make key classes and functions available at the package level.
+# They are imported on first access, so importing one submodule (e.g. the banner)
+# does not pull in the whole quantum stack.
+_LAZY_EXPORTS = {
+    "CircuitObfuscator": (".circuit_obfuscator", "CircuitObfuscator"),
+    "obfuscate_classical_file": (".classical_obfuscator", "obfuscate_file"),
+    "SmartNoiseGenerator": (".quantum_engines", "SmartNoiseGenerator"),
+    "generate_deterministic_circuit": (".quantum_engines", "generate_deterministic_circuit"),
+    "load_data_from_json": (".utils", "load_data_from_json"),
+    "apply_gate_from_token": (".utils", "apply_gate_from_token"),
+    "export_circuit_to_py": (".utils", "export_circuit_to_py"),
+    "IntelligentCodeSplitter": (".code_splitter", "IntelligentCodeSplitter"),
+    "IdentifierManager": (".identifier_manager", "IdentifierManager"),
+    "DecoyCodeGenerator": (".decoy_generator", "DecoyCodeGenerator"),
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _LAZY_EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
 
 __version__ = "1.0.0"
 __author__ = "0xVnex"
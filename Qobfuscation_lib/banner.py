@@ -1,4 +1,5 @@
 import os, time, random
+from functools import lru_cache
 from pyfiglet import Figlet
 from rich.console import Console
 from rich.text import Text
@@ -10,14 +11,20 @@ COLORS = ["bold cyan", "bold magenta", "bold red", "bold green", "bold yellow"]
 
 FONTS = ["slant", "doom", "ansi_shadow", "cyberlarge", "standard"]
 
+GLITCH_CHARS = "!@#$%^&*()_+=-<>?/\\|[]{}"
+
+@lru_cache(maxsize=None)
+def _get_figlet(font):
+    return Figlet(font=font)
+
 def glitch_text(text, cycles=8, delay=0.05):
-    chars = "!@#$%^&*()_+=-<>?/\\|[]{}"
     text_list = list(text)
+    positions = range(len(text))
     for _ in range(cycles):
         glitched = text_list[:]
-        for _ in range(random.randint(1, len(text)//3)):
-            idx = random.randint(0, len(text)-1)
-            glitched[idx] = random.choice(chars)
+        count = random.randint(1, len(text)//3)
+        for idx, char in zip(random.choices(positions, k=count), random.choices(GLITCH_CHARS, k=count)):
+            glitched[idx] = char
         console.print("".join(glitched), style=random.choice(COLORS))
         time.sleep(delay)
         os.system("cls" if os.name == "nt" else "clear")
@@ -27,7 +34,7 @@ def animated_banner():
     glitch_text("QOBFUSCATION", cycles=6, delay=0.07)
 
     font = random.choice(FONTS)
-    f = Figlet(font=font)
+    f = _get_figlet(font)
     banner_text = f.renderText("Qobfuscation")
     color = random.choice(COLORS)
 
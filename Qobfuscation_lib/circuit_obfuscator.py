@@ -1,7 +1,9 @@
+import os
 import random
 import importlib.util
 import time
-import signal
+import numpy as np
+from qiskit import QuantumCircuit
 from Qobfuscation_lib.utils import *
 from Qobfuscation_lib.quantum_engines import SmartNoiseGenerator
 
@@ -11,8 +13,14 @@ class TimeoutException(Exception):
     pass
 
 
-def timeout_handler(signum, frame):
-    raise TimeoutException("The obfuscation process exceeded the time limit.")
+# Layers check the deadline once per this many instructions (or insertion points)
+DEADLINE_CHECK_INTERVAL = 256
+
+
+def check_deadline(deadline):
+    """Raises TimeoutException once the monotonic clock passes the deadline (None means no limit)."""
+    if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutException("The obfuscation process exceeded the time limit.")
 
 
 class CircuitObfuscator:
@@ -69,6 +77,12 @@ class CircuitObfuscator:
 
 
 
+    @staticmethod
+    def output_path_for(file_path):
+        """Path the obfuscated version of file_path is written to."""
+        base_name, ext = os.path.splitext(file_path)
+        return f"{base_name}_obfuscated{ext}"
+
     def _save_circuit_to_file(self, qc, original_path, output_path):
         """Saves the obfuscated circuit back to the appropriate file type."""
         if self.verbose: print(f"[INFO]   -> Saving obfuscated circuit to {output_path}...")
@@ -82,35 +96,66 @@ class CircuitObfuscator:
             with open(output_path, 'w') as f:
                 f.write(py_code)
 
+    @staticmethod
+    def _copy_instructions(new_qc, instructions):
+        """
+        Appends instructions taken from a circuit that shares new_qc's bits.
+        They are already valid for those bits, so the checked append is skipped.
+        """
+        for instruction in instructions:
+            new_qc._append(instruction)
+
+    @staticmethod
+    def _choose_substitutions(qc, data_bank, probability):
+        """
+        Decides up front, for every instruction in qc, which replacement sequence
+        from data_bank to use, or None to keep the original instruction.
+        The rolls and sequence picks are computed as whole numpy arrays, leaving
+        only the gate appends in the per-instruction Python loop.
+        A bank that failed to load (the loader's [] fallback) keeps every instruction.
+        """
+        if not isinstance(data_bank, dict):
+            data_bank = {}
+        gate_names = [instruction.operation.name for instruction in qc.data]
+        bank_sizes = np.array([len(data_bank.get(name, ())) for name in gate_names], dtype=np.int64)
+        selected = (bank_sizes > 0) & (np.random.random(len(gate_names)) < probability)
+        picks = (np.random.random(len(gate_names)) * bank_sizes).astype(np.int64)
+
+        return [
+            data_bank[name][pick] if chosen else None
+            for name, chosen, pick in zip(gate_names, selected.tolist(), picks.tolist())
+        ]
+
     # --- CORE OBFUSCATION ALGORITHMS ---
 
-    def _apply_cloaked_gates(self, qc, **config):
-        probability = config.get('probability', 0.5)
-        new_qc = QuantumCircuit(qc.num_qubits, qc.num_clbits, name=f"{qc.name}_cloaked")
-        for instr, qargs, cargs in qc.data:
-            gate_name = instr.name
-            if gate_name in self.cloaked_data and random.random() < probability:
-                sequence = random.choice(self.cloaked_data[gate_name])
-                qubit_indices = [qc.qubits.index(q) for q in qargs]
+    def _apply_cloaked_gates(self, qc, probability=0.5, deadline=None, **config):
+        new_qc = qc.copy_empty_like(name=f"{qc.name}_cloaked")
+        qubit_to_idx = {q: i for i, q in enumerate(qc.qubits)}
+        substitutions = self._choose_substitutions(qc, self.cloaked_data, probability)
+        for i, (instruction, sequence) in enumerate(zip(qc.data, substitutions)):
+            if not i % DEADLINE_CHECK_INTERVAL:
+                check_deadline(deadline)
+            if sequence is not None:
+                qubit_indices = [qubit_to_idx[q] for q in instruction.qubits]
                 for token in sequence:
                     apply_gate_from_token(new_qc, token, qubit_indices)
             else:
-                new_qc.append(instr, qargs, cargs)
+                new_qc._append(instruction)
         return new_qc
 
-    def _apply_inverse_gates(self, qc, **config):
-        density = config.get('density', 0.3)
+    def _apply_inverse_gates(self, qc, density=0.3, deadline=None, **config):
         num_insertions = int(len(qc.data) * density)
         instructions = list(qc.data)
-        insertion_points = sorted(random.sample(range(len(instructions) + 1), num_insertions))
+        insertion_points = np.sort(np.random.choice(len(instructions) + 1, size=num_insertions, replace=False)).tolist()
 
-        new_qc = QuantumCircuit(qc.num_qubits, qc.num_clbits, name=f"{qc.name}_noisy")
+        new_qc = qc.copy_empty_like(name=f"{qc.name}_noisy")
         instr_idx = 0
 
-        for insert_point in insertion_points:
-            while instr_idx < insert_point and instr_idx < len(instructions):
-                new_qc.append(instructions[instr_idx])
-                instr_idx += 1
+        for i, insert_point in enumerate(insertion_points):
+            if not i % DEADLINE_CHECK_INTERVAL:
+                check_deadline(deadline)
+            self._copy_instructions(new_qc, instructions[instr_idx:insert_point])
+            instr_idx = insert_point
 
             if new_qc.num_qubits > 0:
                 num_target_qubits = min(new_qc.num_qubits, random.randint(1, 2))
@@ -118,43 +163,41 @@ class CircuitObfuscator:
 
                 self.noise_generator.inject(new_qc, target_qubits, level=random.choice(['light', 'medium']))
 
-        while instr_idx < len(instructions):
-            new_qc.append(instructions[instr_idx])
-            instr_idx += 1
+        self._copy_instructions(new_qc, instructions[instr_idx:])
 
         return new_qc
 
-    def _apply_delayed_gates(self, qc, **config):
+    def _apply_delayed_gates(self, qc, probability=0.5, deadline=None, **config):
         """
         Applies obfuscation by replacing gates with equivalent, more complex sequences.
         This is the CORRECTED version.
         """
-        probability = config.get('probability', 0.5)
-        new_qc = QuantumCircuit(qc.num_qubits, qc.num_clbits, name=f"{qc.name}_delayed")
-
-        for instr, qargs, cargs in qc.data:
-            gate_name = instr.name
-            qubit_indices = [qc.qubits.index(q) for q in qargs]
+        new_qc = qc.copy_empty_like(name=f"{qc.name}_delayed")
+        qubit_to_idx = {q: i for i, q in enumerate(qc.qubits)}
+        substitutions = self._choose_substitutions(qc, self.delayed_data, probability)
 
-            # Check if the gate can be obfuscated and if it passes the random check
-            if gate_name in self.delayed_data and random.random() < probability:
+        for i, (instruction, chosen_identity) in enumerate(zip(qc.data, substitutions)):
+            if not i % DEADLINE_CHECK_INTERVAL:
+                check_deadline(deadline)
 
-                # 1. Choose a full identity sequence randomly
-                chosen_identity = random.choice(self.delayed_data[gate_name])
+            # 1. A full identity sequence was chosen if the gate can be obfuscated
+            # and passed the random check
+            if chosen_identity is not None:
 
                 # 2. Apply each gate from the chosen identity
+                qubit_indices = [qubit_to_idx[q] for q in instruction.qubits]
                 for token in chosen_identity:
                     apply_gate_from_token(new_qc, token, qubit_indices)
 
-                # 3. We do NOT append the original instruction (instr)
+                # 3. We do NOT append the original instruction
                 # The replacement is now complete.
             else:
                 # If not obfuscating, just append the original instruction
-                new_qc.append(instr, qargs, cargs)
+                new_qc._append(instruction)
 
         return new_qc
 
-    def _apply_composite_gates(self, qc, **config):
+    def _apply_composite_gates(self, qc, density=0.2, deadline=None, **config):
         """
         Injects complex identity sequences from aux_res.json into the circuit
         at random points to increase complexity without changing the final output.
@@ -163,80 +206,99 @@ class CircuitObfuscator:
             if self.verbose: print("⚠️ Warning: Composite gate data not found. Skipping.")
             return qc
 
-        density = config.get('density', 0.2)
         num_insertions = int(len(qc.data) * density)
         if num_insertions == 0: return qc
 
         instructions = list(qc.data)
-        insertion_points = sorted(random.sample(range(len(instructions) + 1), num_insertions))
+        insertion_points = np.sort(np.random.choice(len(instructions) + 1, size=num_insertions, replace=False)).tolist()
 
-        new_qc = QuantumCircuit(qc.num_qubits, qc.num_clbits, name=f"{qc.name}_composite")
+        new_qc = qc.copy_empty_like(name=f"{qc.name}_composite")
         instr_idx = 0
+        # A single qubit argument holding every index makes Qiskit broadcast
+        # the gate across the whole register in one call
+        all_qubits = [list(range(qc.num_qubits))]
 
-        for insert_point in insertion_points:
+        for i, insert_point in enumerate(insertion_points):
+            if not i % DEADLINE_CHECK_INTERVAL:
+                check_deadline(deadline)
             # Append original instructions up to the insertion point
-            while instr_idx < insert_point and instr_idx < len(instructions):
-                new_qc.append(instructions[instr_idx])
-                instr_idx += 1
+            self._copy_instructions(new_qc, instructions[instr_idx:insert_point])
+            instr_idx = insert_point
 
             # --- IDENTITY INJECTION LOGIC ---
             aux_seq, res_seq = random.choice(self.aux_res_data)
 
             # Apply the sequence and its inverse consecutively to all qubits
             for token in aux_seq:
-                for i in range(qc.num_qubits):
-                    apply_gate_from_token(new_qc, token, [i])
+                apply_gate_from_token(new_qc, token, all_qubits)
 
             for token in res_seq:
-                for i in range(qc.num_qubits):
-                    apply_gate_from_token(new_qc, token, [i])
+                apply_gate_from_token(new_qc, token, all_qubits)
 
         # Append the rest of the original instructions
-        while instr_idx < len(instructions):
-            new_qc.append(instructions[instr_idx])
-            instr_idx += 1
+        self._copy_instructions(new_qc, instructions[instr_idx:])
 
         return new_qc
 
     def obfuscate(self, file_path, techniques, max_qubits=30, max_depth=1000, timeout=60):
-        signal.alarm(timeout)
+        """
+        Applies each (name, config) technique in turn and writes the result next to file_path.
+        Returns the output path on success, None otherwise.
+        The timeout is checked after loading and inside each layer, every
+        DEADLINE_CHECK_INTERVAL instructions, so a slow layer is cut short.
+        """
+        # Resolve every layer to its bound implementation before running any of them
+        plan = []
+        for tech_name, config in techniques:
+            if tech_name in self._algo_map:
+                plan.append((tech_name, self._algo_map[tech_name], config))
+            else:
+                print(f"⚠️ Warning: Unknown quantum algorithm '{tech_name}'. Skipping.")
+
+        # Nothing to apply: skip loading and writing the circuit entirely
+        if not plan:
+            print("⚠️ Warning: No applicable quantum algorithms were given. Nothing to do.")
+            return
+
+        # Cooperative deadline, checked after loading and within the layers (portable, unlike SIGALRM)
+        deadline = time.monotonic() + timeout
 
         try:
             current_qc = self._load_circuit_from_file(file_path)
+            check_deadline(deadline)
 
             if self.verbose:
                 print(f"[INFO]   -> Circuit '{current_qc.name}' loaded successfully.")
-                print(f"[INFO]   -> Properties: {current_qc.num_qubits} qubits, depth {current_qc.depth()}.")
 
             if current_qc.num_qubits > max_qubits:
                 print(f"❌ Error: Circuit exceeds qubit limit ({current_qc.num_qubits} > {max_qubits}). Aborting.")
-                signal.alarm(0);
                 return
-            if current_qc.depth() > max_depth:
-                print(f"⚠️ Warning: Circuit depth ({current_qc.depth()}) exceeds recommended limit of {max_depth}.")
-
-            for tech_name, config in techniques:
-                if tech_name in self._algo_map:
-                    if self.verbose: print(f"--> Applying layer: '{tech_name}' with config: {config}")
-                    start_time = time.time()
-                    current_qc = self._algo_map[tech_name](current_qc, **config)
-                    end_time = time.time()
-                    if self.verbose:
-                        print(f"    ... Layer '{tech_name}' applied in {end_time - start_time:.2f} seconds.")
-                        print(f"    ... New circuit depth: {current_qc.depth()}.")
-                else:
-                    print(f"⚠️ Warning: Unknown quantum algorithm '{tech_name}'. Skipping.")
 
-            base_name, ext = os.path.splitext(file_path)
-            output_path = f"{base_name}_obfuscated{ext}"
+            # Depth is a full traversal of the circuit, so compute it only once
+            initial_depth = current_qc.depth()
+            if self.verbose:
+                print(f"[INFO]   -> Properties: {current_qc.num_qubits} qubits, depth {initial_depth}.")
+
+            if initial_depth > max_depth:
+                print(f"⚠️ Warning: Circuit depth ({initial_depth}) exceeds recommended limit of {max_depth}.")
+
+            for tech_name, apply_layer, config in plan:
+                if self.verbose: print(f"--> Applying layer: '{tech_name}' with config: {dict(config)}")
+                start_time = time.time()
+                current_qc = apply_layer(current_qc, deadline=deadline, **config)
+                end_time = time.time()
+                if self.verbose:
+                    print(f"    ... Layer '{tech_name}' applied in {end_time - start_time:.2f} seconds.")
+                    print(f"    ... New circuit depth: {current_qc.depth()}.")
+
+            output_path = self.output_path_for(file_path)
             self._save_circuit_to_file(current_qc, file_path, output_path)
 
             print(f"✅ Success! Obfuscation complete.")
+            return output_path
 
         except TimeoutException as e:
             print(f"❌ Error: {e}")
         except Exception as e:
             print(f"❌ An unexpected error occurred: {e}")
-        finally:
-            signal.alarm(0)
 
@@ -1,8 +1,9 @@
+import ast
 import os
 import random
 import datetime
-import textwrap
-from typing import Tuple, Dict, Any, List
+import string
+from typing import Tuple, Dict, Any, Iterator, List, Optional
 
 from qiskit import QuantumCircuit
 
@@ -64,19 +65,36 @@ def _generate_deterministic_circuit_instructions(qc_var_name: str) -> Tuple[str,
 
 
 
-def _prepare_injected_code(src: str, algo: str, indent_part1: int = 8, indent_part2: int = 12) -> Dict[str, Any]:
+# Indent prefixes for the default injection depths
+_INDENT8 = " " * 8
+_INDENT12 = " " * 12
+
+
+def _indent(text: str, prefix: str) -> str:
+    """
+    Same result as textwrap.indent with its default predicate: lines holding only
+    whitespace are left untouched. Avoids the per-line predicate call.
+    """
+    return "".join([prefix + line if line.strip() else line for line in text.splitlines(True)])
+
+
+def _prepare_injected_code(src: str, algo: str, indent_part1: int = 8, indent_part2: int = 12,
+                           tree: ast.Module = None) -> Dict[str, Any]:
     """
     Prepare code for injection, now using the robust AST-based splitter.
+    If given, `tree` is the parsed form of `src` and is handed to the splitter as is.
     """
-    indented_code = textwrap.indent(src.rstrip() + "\n", " " * indent_part1)
+    prefix1 = _INDENT8 if indent_part1 == 8 else " " * indent_part1
+    prefix2 = _INDENT12 if indent_part2 == 12 else " " * indent_part2
+    indented_code = _indent(src.rstrip() + "\n", prefix1)
 
     if algo == "shroud":
         splitter = IntelligentCodeSplitter()
-        part1, part2 = splitter.split(src)
+        part1, part2 = splitter.split(src, tree=tree)
         return {
             "indented_code": indented_code,
-            "indented_code_part1": textwrap.indent(part1 + "\n", " " * indent_part1),
-            "indented_code_part2": textwrap.indent(part2 + "\n", " " * indent_part2),
+            "indented_code_part1": _indent(part1 + "\n", prefix1),
+            "indented_code_part2": _indent(part2 + "\n", prefix2),
         }
 
     return {
@@ -85,16 +103,24 @@ def _prepare_injected_code(src: str, algo: str, indent_part1: int = 8, indent_pa
         "indented_code_part2": indented_code,
     }
 
+# Format spec for gate parameters in the generated code
+PARAM_FORMAT_SPEC = ".15f"
+
+
 def _format_param(p) -> str:
     """
     Formats gate parameters as high-precision floating-point numbers
     to increase obscurity for human analysis.
     """
+    # Fast path for the common case of a plain float angle
+    if type(p) is float:
+        return format(p, PARAM_FORMAT_SPEC)
+
     if not isinstance(p, (float, int)):
         return str(p)
 
     try:
-        return f"{float(p):.15f}"
+        return format(float(p), PARAM_FORMAT_SPEC)
     except Exception:
         return str(p)
 
@@ -110,68 +136,97 @@ def _sequence_to_code_lines(qc: QuantumCircuit, var_name: str = "qc") -> List[st
         var_name (str): variable name to use instead of 'qc'
     """
     lines = []
-    for instr, qargs, cargs in qc.data:
-        if hasattr(instr, "operation"):
-            op = instr.operation
-        else:
-            op = instr
+    append = lines.append
+    prefix = var_name + "."
+    qubit_to_idx = {q: i for i, q in enumerate(qc.qubits)}
+    clbit_to_idx = {c: i for i, c in enumerate(qc.clbits)}
+    for instr in qc.data:
+        op = instr.operation
+        parts = [_format_param(p) for p in op.params]
+        parts.extend([str(qubit_to_idx[q]) for q in instr.qubits])
+        parts.extend([str(clbit_to_idx[c]) for c in instr.clbits])
+        append(f"{prefix}{op.name}({', '.join(parts)})")
 
-        opname = getattr(op, "name", str(op))
-        qubit_indices = [qc.qubits.index(q) for q in qargs]
-        clbit_indices = [qc.clbits.index(c) for c in cargs]
+    return lines
 
-        params = []
-        if getattr(op, "params", None):
-            params = [_format_param(p) for p in op.params]
 
-        args = params + [str(q) for q in qubit_indices] + [str(c) for c in clbit_indices]
 
-        arg_str = ", ".join(args)
-        if arg_str:
-            lines.append(f"{var_name}.{opname}({arg_str})")
-        else:
-            lines.append(f"{var_name}.{opname}()")
+def _iter_template(algo: str, subs: Dict[str, Any]) -> Iterator[str]:
+    """
+    Yields the rendered fragments of a template from its pre-parsed field list,
+    so the output can be streamed without re-parsing the template text.
+    Raises KeyError for a field missing from subs, like str.format.
+    """
+    for literal, field, spec, conversion in COMPILED_TEMPLATES[algo]:
+        yield literal
+        if field is not None:
+            value = _FORMATTER.convert_field(subs[field], conversion)
+            yield format(value, spec)
 
-    return lines
 
+def _one_noise_snippet(qc_tmp: QuantumCircuit, target_qubits: List[int], level: str, var_name: str,
+                       noise_generator: SmartNoiseGenerator) -> str:
+    """Inject one round of noise into the (empty) `qc_tmp` and render it as code."""
+    chosen_level = level or random.choice(['light', 'medium', 'heavy'])
+
+    try:
+        noise_generator.inject(qc_tmp, target_qubits, level=chosen_level)
+    except Exception:
+        for q in target_qubits:
+            qc_tmp.h(q)
+
+    return "\n    ".join(_sequence_to_code_lines(qc_tmp, var_name=var_name))
 
 
-def _generate_noise(target_qubits=None, repeats: int = 1, level: str = None,var_name: str = "qc") -> str:
+def _generate_noise(target_qubits=None, repeats: int = 1, level: str = None,var_name: str = "qc",
+                    noise_generator: SmartNoiseGenerator = None) -> str:
     if target_qubits is None:
         target_qubits = [0]
     if isinstance(target_qubits, int):
         target_qubits = [target_qubits]
+    target_qubits = list(target_qubits)
 
-    noise_generator = SmartNoiseGenerator()
-    snippets = []
+    if noise_generator is None:
+        noise_generator = SmartNoiseGenerator()
 
-    for _ in range(max(1, repeats)):
-        chosen_level = level or random.choice(['light', 'medium', 'heavy'])
+    # The circuit width only depends on the targets, so work it out once
+    if len(target_qubits) == 1:
+        num_qubits = target_qubits[0] + 1
+    else:
         num_qubits = max(target_qubits) + 1 if target_qubits else 1
-        qc_tmp = QuantumCircuit(num_qubits)
 
-        try:
-            noise_generator.inject(qc_tmp, list(target_qubits), level=chosen_level)
-        except Exception:
-            for q in target_qubits:
-                qc_tmp.h(q)
+    qc_tmp = QuantumCircuit(num_qubits)
+    if repeats <= 1:
+        return _one_noise_snippet(qc_tmp, target_qubits, level, var_name, noise_generator)
+
+    # One scratch circuit serves every round; it is emptied before each injection
+    snippets = []
+    for _ in range(repeats):
+        qc_tmp.data.clear()
+        snippets.append(_one_noise_snippet(qc_tmp, target_qubits, level, var_name, noise_generator))
 
-        lines = _sequence_to_code_lines(qc_tmp, var_name=var_name)
-        snippets.append("\n    ".join(lines))
+    return "\n    ".join(snippets)
 
-    final = "\n    ".join(snippets)
 
-    return final
 
+def output_path_for(file_path: str, algo: str) -> str:
+    """Path obfuscate_file writes the obfuscated version of file_path to."""
+    base, ext = os.path.splitext(file_path)
+    return f"{base}_obf_{algo}{ext}"
 
 
-def obfuscate_file(file_path: str, algo: str) -> Tuple[str, str]:
+def obfuscate_file(file_path: str, algo: str, return_text: bool = True,
+                   stat_result: Optional[os.stat_result] = None) -> Tuple[str, Optional[str]]:
     """
     Obfuscate a Python file using a quantum-inspired template.
 
     Args:
         file_path (str): Path to the original Python file.
         algo (str): Template key (simple_entanglement, variable_pairs, shroud, deterministic).
+        return_text (bool): If False, the output is streamed to disk without
+            building the full text in memory, and None is returned in its place.
+        stat_result (os.stat_result): Result of a stat() the caller already made on
+            file_path; when given, the existence check is skipped.
 
     Returns:
         (output_path, obfuscated_text)
@@ -181,17 +236,25 @@ def obfuscate_file(file_path: str, algo: str) -> Tuple[str, str]:
             f"Unknown algo '{algo}'. Available: {list(TEMPLATES.keys())}"
         )
 
-    if not os.path.exists(file_path):
+    if stat_result is None and not os.path.exists(file_path):
         raise FileNotFoundError(file_path)
 
     with open(file_path, "r", encoding="utf-8") as f:
-        manager = IdentifierManager()
-        src = manager.rename_identifiers(f.read())
+        source = f.read()
         target = [0]
         target2 = 0
         target3 = 0
         repeats = 1
 
+    # Parse once: the renamed tree is reused by the splitter instead of re-parsing src
+    manager = IdentifierManager()
+    try:
+        tree = manager.rename_tree(ast.parse(source))
+        src = ast.unparse(tree)
+    except SyntaxError:
+        tree = None
+        src = source
+
     if algo == "simple_entanglement":
         target = [0, 1]
         repeats = 2
@@ -215,29 +278,33 @@ def obfuscate_file(file_path: str, algo: str) -> Tuple[str, str]:
         repeats = 1
 
     var_name = DecoyCodeGenerator._get_random_identifier("casss")
-    noise_snippet = _generate_noise(target_qubits=target, repeats=repeats, level=None,var_name=var_name)
-    noise_snippet2 = _generate_noise(target_qubits=target2, repeats=repeats, level=None,var_name=var_name)
-    noise_snippet3 = _generate_noise(target_qubits=target3, repeats=repeats, level=None,var_name=var_name)
-
-    subs: Dict[str, Any] = {
-        "NoiseGenerator": noise_snippet,
-        "NoiseGenerator2": noise_snippet2,
-        "NoiseGenerator3": noise_snippet3,
-        "expected_outcome": "0",
-        "random_method": DecoyCodeGenerator.generate_random_method(),
-        "rand_var1": DecoyCodeGenerator._get_random_identifier(),
-        "rand_var2": DecoyCodeGenerator._get_random_identifier("val"),
-        "rand_var3": DecoyCodeGenerator._get_random_identifier(),
-        "rand_result": DecoyCodeGenerator._get_random_identifier("res"),
-        "outcome_var": DecoyCodeGenerator._get_random_identifier("dsa"),
-        "trigger_func": DecoyCodeGenerator._get_random_identifier("func"),
-        "pattern_var": DecoyCodeGenerator._get_random_identifier("pattern"),
-        "qc": var_name,
-        "rand_id": DecoyCodeGenerator._get_random_identifier("ctx"),
-        "main": DecoyCodeGenerator._get_random_identifier(),
+    noise_generator = SmartNoiseGenerator()
 
+    def _noise(targets) -> str:
+        return _generate_noise(target_qubits=targets, repeats=repeats, level=None, var_name=var_name,
+                               noise_generator=noise_generator)
+
+    # Only the placeholders the chosen template actually uses are generated
+    factories = {
+        "NoiseGenerator": lambda: _noise(target),
+        "NoiseGenerator2": lambda: _noise(target2),
+        "NoiseGenerator3": lambda: _noise(target3),
+        "expected_outcome": lambda: "0",
+        "random_method": DecoyCodeGenerator.generate_random_method,
+        "rand_var1": DecoyCodeGenerator._get_random_identifier,
+        "rand_var2": lambda: DecoyCodeGenerator._get_random_identifier("val"),
+        "rand_var3": DecoyCodeGenerator._get_random_identifier,
+        "rand_result": lambda: DecoyCodeGenerator._get_random_identifier("res"),
+        "outcome_var": lambda: DecoyCodeGenerator._get_random_identifier("dsa"),
+        "trigger_func": lambda: DecoyCodeGenerator._get_random_identifier("func"),
+        "pattern_var": lambda: DecoyCodeGenerator._get_random_identifier("pattern"),
+        "qc": lambda: var_name,
+        "rand_id": lambda: DecoyCodeGenerator._get_random_identifier("ctx"),
+        "main": DecoyCodeGenerator._get_random_identifier,
     }
-    subs.update(_prepare_injected_code(src, algo))
+    fields = TEMPLATE_FIELDS[algo]
+    subs: Dict[str, Any] = {key: make() for key, make in factories.items() if key in fields}
+    subs.update(_prepare_injected_code(src, algo, tree=tree))
 
     if algo == "deterministic":
         (
@@ -245,16 +312,16 @@ def obfuscate_file(file_path: str, algo: str) -> Tuple[str, str]:
             outcome,
             qubits,
             clbits,
-        ) = _generate_deterministic_circuit_instructions(subs["qc"])
+        ) = _generate_deterministic_circuit_instructions(var_name)
 
         subs["circuit_build_instructions"] = instructions
         subs["expected_outcome"] = outcome
         subs["num_qubits"] = qubits
         subs["num_clbits"] = clbits
-    try:
-        filled = TEMPLATES[algo].format(**subs)
-    except KeyError as e:
-        raise ObfuscationError(f"Template missing key: {e}")
+    # Validate up front so a missing key never leaves a partially written file
+    missing = fields - subs.keys()
+    if missing:
+        raise ObfuscationError(f"Template missing key: {min(missing)!r}")
 
     header = (
         "# ======================================================================\n"
@@ -263,13 +330,16 @@ def obfuscate_file(file_path: str, algo: str) -> Tuple[str, str]:
         f"# Generated: {datetime.datetime.now().isoformat()}\n"
         "# ======================================================================\n\n"
     )
-    obfuscated_text = header + filled
+    fragments = _iter_template(algo, subs)
+    if return_text:
+        fragments = list(fragments)
 
-    base, ext = os.path.splitext(file_path)
-    output_path = f"{base}_obf_{algo}{ext}"
+    output_path = output_path_for(file_path, algo)
     with open(output_path, "w", encoding="utf-8") as outf:
-        outf.write(obfuscated_text)
+        outf.write(header)
+        outf.writelines(fragments)
 
+    obfuscated_text = header + "".join(fragments) if return_text else None
     return output_path, obfuscated_text
 
 
@@ -321,7 +391,7 @@ from qiskit_aer import AerSimulator
 def {trigger_func}():
     {rand_var1} = random.randint(3, 5)
     {rand_var2} = {rand_var1} * 2
-    {pattern_var} = ''.join(random.choice(['0','1']) for _ in range({rand_var2}))
+    {pattern_var} = format(random.getrandbits({rand_var2}), '0' + str({rand_var2}) + 'b')
     {qc} = qiskit.QuantumCircuit({rand_var2}, {rand_var2})
     {NoiseGenerator}
     {NoiseGenerator}
@@ -440,3 +510,12 @@ TEMPLATES = {
     'shroud': SHROUD_TEMPLATE,
     'deterministic': DETERMINISTIC_TEMPLATE
 }
+
+# Templates parsed once into (literal, field, spec, conversion) tuples for _iter_template
+_FORMATTER = string.Formatter()
+COMPILED_TEMPLATES = {name: list(_FORMATTER.parse(template)) for name, template in TEMPLATES.items()}
+# Placeholder names used by each template, so obfuscate_file only builds what is needed
+TEMPLATE_FIELDS = {
+    name: frozenset(field for _, field, _, _ in parsed if field is not None)
+    for name, parsed in COMPILED_TEMPLATES.items()
+}
@@ -1,7 +1,8 @@
 # Qobfuscation_lib/code_splitter.py
 import ast
 import random
-from typing import List, Tuple, Union
+from collections import defaultdict
+from typing import List, Optional, Tuple, Union
 
 
 class IntelligentCodeSplitter:
@@ -13,14 +14,16 @@ class IntelligentCodeSplitter:
     def __init__(self, protected_funcs: List[str] = None):
         self.protected_funcs = protected_funcs if protected_funcs is not None else []
 
-    def split(self, src: str) -> Tuple[str, str]:
+    def split(self, src: str, tree: Optional[ast.Module] = None) -> Tuple[str, str]:
         """
         The main public method to split the source code into two logical parts.
+        An already parsed `tree` of `src` can be passed to skip parsing it again.
         """
-        try:
-            tree = ast.parse(src)
-        except SyntaxError:
-            return src, "pass"
+        if tree is None:
+            try:
+                tree = ast.parse(src)
+            except SyntaxError:
+                return src, "pass"
 
         import_nodes, protected_defs, safe_defs, main_block = self._categorize_nodes(tree)
 
@@ -31,11 +34,8 @@ class IntelligentCodeSplitter:
         part1_groups = atomic_groups[:split_point]
         part2_groups = atomic_groups[split_point:]
 
-        part1_defs = [node for group in part1_groups for node in group]
-        part2_defs = [node for group in part2_groups for node in group]
-
-        part1_nodes = import_nodes + protected_defs + part1_defs
-        part2_nodes = import_nodes + protected_defs + part2_defs
+        part1_nodes = [*import_nodes, *protected_defs, *(node for group in part1_groups for node in group)]
+        part2_nodes = [*import_nodes, *protected_defs, *(node for group in part2_groups for node in group)]
         if main_block:
             part2_nodes.append(main_block)
 
@@ -59,71 +59,77 @@ class IntelligentCodeSplitter:
         return import_nodes, protected_defs, safe_defs, main_block
 
     def _group_dependent_statements(self, statements: List[ast.AST]) -> List[List[ast.AST]]:
+        """
+        Groups statements that are linked by a variable defined in one and used in
+        another (transitively), using union-find over the variable names.
+        Statements keep their original source order within each group.
+        """
         if not statements: return []
 
         analyzer = _VariableUsageAnalyzer()
-        analyzed_nodes = [{'node': node, 'defines': analyzer.analyze(node)[0], 'uses': analyzer.analyze(node)[1]} for
-                          node in statements]
-
-        groups = [[node_info] for node_info in analyzed_nodes]
-
-        merged_in_pass = True
-        while merged_in_pass:
-            merged_in_pass = False
-            i = 0
-            while i < len(groups):
-                j = i + 1
-                while j < len(groups):
-                    g1_defines = {d for item in groups[i] for d in item['defines']}
-                    g2_uses = {u for item in groups[j] for u in item['uses']}
-                    g2_defines = {d for item in groups[j] for d in item['defines']}
-                    g1_uses = {u for item in groups[i] for u in item['uses']}
-
-                    if g1_defines.intersection(g2_uses) or g2_defines.intersection(g1_uses):
-                        groups[i].extend(groups.pop(j))
-                        merged_in_pass = True
-                    else:
-                        j += 1
-                i += 1
-
-        return [[item['node'] for item in group] for group in groups]
+        definers, users = defaultdict(list), defaultdict(list)
+        for index, node in enumerate(statements):
+            defines, uses = analyzer.analyze(node)
+            for name in defines:
+                definers[name].append(index)
+            for name in uses:
+                users[name].append(index)
+
+        parent = list(range(len(statements)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for name, defining_nodes in definers.items():
+            if name not in users:
+                continue
+            linked = defining_nodes + users[name]
+            root = find(linked[0])
+            for index in linked[1:]:
+                other = find(index)
+                if other != root:
+                    parent[other] = root
+
+        groups = defaultdict(list)
+        for index, node in enumerate(statements):
+            groups[find(index)].append(node)
+
+        return list(groups.values())
 
     def _safe_unparse(self, nodes: List[ast.AST]) -> str:
+        # The nodes come straight from ast.parse, so their locations are already
+        # set and a single unparse of the wrapping module is enough
         try:
-            module = ast.Module(body=nodes, type_ignores=[])
-            ast.fix_missing_locations(module)
-            return ast.unparse(module)
+            return ast.unparse(ast.Module(body=nodes, type_ignores=[]))
         except Exception:
-            return "\n".join([ast.unparse(n) for n in nodes]) if nodes else "pass"
+            return "\n".join(ast.unparse(n) for n in nodes) if nodes else "pass"
 
 
-class _VariableUsageAnalyzer(ast.NodeVisitor):
+class _VariableUsageAnalyzer:
     """
     Analyzes an AST node to find all variables it defines and uses.
-    Version 2: Now correctly identifies function and class definitions.
+    Version 3: Walks the subtree iteratively with ast.walk instead of
+    NodeVisitor dispatch, still identifying function and class definitions.
     """
-    def visit_Name(self, node):
-        if isinstance(node.ctx, ast.Store):
-            self.defined.add(node.id)
-        elif isinstance(node.ctx, ast.Load):
-            self.used.add(node.id)
-
-    def visit_arg(self, node):
-        self.defined.add(node.arg)
-
-    def visit_FunctionDef(self, node):
-        self.defined.add(node.name)
-        self.generic_visit(node)
-
-    def visit_ClassDef(self, node):
-        self.defined.add(node.name)
-        self.generic_visit(node)
-
     def analyze(self, node):
         self.defined, self.used = set(), set()
-        self.visit(node)
-
-        if hasattr(node, 'name') and node.name in self.used:
-            self.used.remove(node.name)
-
-        return self.defined, self.used
\ No newline at end of file
+        defined, used = self.defined, self.used
+
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                if isinstance(child.ctx, ast.Store):
+                    defined.add(child.id)
+                elif isinstance(child.ctx, ast.Load):
+                    used.add(child.id)
+            elif isinstance(child, ast.arg):
+                defined.add(child.arg)
+            elif isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                defined.add(child.name)
+
+        if hasattr(node, 'name') and node.name in used:
+            used.remove(node.name)
+
+        return defined, used
\ No newline at end of file
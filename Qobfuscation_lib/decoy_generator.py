@@ -1,6 +1,9 @@
 import random
 import string
 
+# Characters allowed after the prefix of a generated identifier
+IDENTIFIER_ALPHABET = string.ascii_letters + string.digits
+
 
 class DecoyCodeGenerator:
     """
@@ -10,8 +13,7 @@ class DecoyCodeGenerator:
     @staticmethod
     def _get_random_identifier(prefix: str = "var", length: int = 8) -> str:
         """Generates a random, safe Python identifier."""
-        letters = string.ascii_letters + string.digits
-        suffix = ''.join(random.choice(letters) for _ in range(length))
+        suffix = ''.join(random.choices(IDENTIFIER_ALPHABET, k=length))
         return f"{prefix}_{suffix}"
 
     @staticmethod
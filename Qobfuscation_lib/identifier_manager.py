@@ -31,88 +31,80 @@ class IdentifierManager:
         except SyntaxError:
             return source_code
 
-        # Clean up imports first
-        remover = self._ImportRemover(self.template_provided_imports)
-        clean_tree = remover.visit(tree)
-        ast.fix_missing_locations(clean_tree)
+        return ast.unparse(self.rename_tree(tree))
+
+    def rename_tree(self, tree: ast.Module) -> ast.Module:
+        """
+        Same as rename_identifiers, but works on an already parsed module and
+        returns the cleaned, renamed tree so callers can reuse it without re-parsing.
+        """
+        # Clean up imports and find all identifiers to be renamed in a single pass
+        collector = self._ImportCleaningCollector(self.template_provided_imports)
+        clean_tree = collector.visit(tree)
 
-        # Find all identifiers to be renamed
-        collector = self._NameCollector()
-        collector.visit(clean_tree)
         name_map = {name: self._random_identifier() for name in collector.defined_names}
 
         if not name_map:
-            return ast.unparse(clean_tree)
+            return clean_tree
 
         # Rename the collected identifiers
-        renamer = self._Renamer(name_map)
-        final_tree = renamer.visit(clean_tree)
-        ast.fix_missing_locations(final_tree)
+        self._rename_nodes(clean_tree, name_map)
+        ast.fix_missing_locations(clean_tree)
 
-        return ast.unparse(final_tree)
+        return clean_tree
+
+    @staticmethod
+    def _rename_nodes(tree, name_map):
+        """
+        Renames identifiers in place with a single iterative ast.walk, instead of
+        a NodeTransformer that re-enters Python for every visited node.
+        """
+        get = name_map.get
+        for node in ast.walk(tree):
+            node_type = type(node)
+            if node_type is ast.Name:
+                node.id = get(node.id, node.id)
+            elif node_type is ast.Attribute:
+                node.attr = get(node.attr, node.attr)
+            elif node_type is ast.arg:
+                node.arg = get(node.arg, node.arg)
+            elif node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef or node_type is ast.ClassDef:
+                node.name = get(node.name, node.name)
 
     # --- Nested helper classes for internal use ---
-    class _ImportRemover(ast.NodeTransformer):
+    class _ImportCleaningCollector(ast.NodeTransformer):
+        # Removes template-provided imports and collects user-defined names
+        # during the same traversal.
         def __init__(self, imports_to_remove):
             self.imports_to_remove = imports_to_remove
+            self.defined_names = set()
+            self.ignored_names = {"self", "__init__"}
 
         def visit_Import(self, node):
-            node.names = [alias for alias in node.names if alias.name not in self.imports_to_remove]
+            imports_to_remove = self.imports_to_remove
+            node.names = [alias for alias in node.names if alias.name not in imports_to_remove]
             return node if node.names else None
 
         def visit_ImportFrom(self, node):
             return None if node.module in self.imports_to_remove else node
 
-    class _NameCollector(ast.NodeVisitor):
-        def __init__(self):
-            self.defined_names = set()
-            self.ignored_names = {"self", "__init__"}
-
         def visit_FunctionDef(self, node):
-            if node.name not in self.ignored_names: self.defined_names.add(node.name)
+            ignored, defined = self.ignored_names, self.defined_names
+            if node.name not in ignored: defined.add(node.name)
             for arg in node.args.args:
-                if arg.arg not in self.ignored_names: self.defined_names.add(arg.arg)
+                if arg.arg not in ignored: defined.add(arg.arg)
             self.generic_visit(node)
+            return node
 
         def visit_Assign(self, node):
+            ignored, defined = self.ignored_names, self.defined_names
             for target in node.targets:
-                if isinstance(target, ast.Name) and target.id not in self.ignored_names:
-                    self.defined_names.add(target.id)
-            self.generic_visit(node)
-
-        def visit_ClassDef(self, node):
-            if node.name not in self.ignored_names: self.defined_names.add(node.name)
-            self.generic_visit(node)
-
-    class _Renamer(ast.NodeTransformer):
-        def __init__(self, name_map):
-            self.name_map = name_map
-
-        def visit_Name(self, node):
-            node.id = self.name_map.get(node.id, node.id)
-            return node
-
-        def visit_Attribute(self, node):
-
-            self.generic_visit(node)
-            if node.attr in self.name_map:
-                node.attr = self.name_map[node.attr]
-            return node
-
-        # ----------------------------------------------
-
-        def visit_FunctionDef(self, node):
-            node.name = self.name_map.get(node.name, node.name)
-            for arg in node.args.args:
-                arg.arg = self.name_map.get(arg.arg, arg.arg)
+                if isinstance(target, ast.Name) and target.id not in ignored:
+                    defined.add(target.id)
             self.generic_visit(node)
             return node
 
         def visit_ClassDef(self, node):
-            node.name = self.name_map.get(node.name, node.name)
+            if node.name not in self.ignored_names: self.defined_names.add(node.name)
             self.generic_visit(node)
-            return node
-
-        def visit_arg(self, node):
-            node.arg = self.name_map.get(node.arg, node.arg)
             return node
\ No newline at end of file
@@ -4,6 +4,9 @@ from qiskit import QuantumCircuit
 # Import utilities from the same package
 from .utils import apply_gate_from_token, load_data_from_json
 
+# Gate names that need at least two target qubits to be applied
+MULTI_QUBIT_GATES = {'cx', 'cz', 'swap', 'ccx', 'cswap'}
+
 
 # ==============================================================================
 # == ⚙️ 1. THE NOISE ENGINE ⚙️
@@ -29,6 +32,8 @@ class SmartNoiseGenerator:
         - Medium:  5–8 gates
         - Heavy:   9+ gates
         If a tier is empty, it falls back to the full gate bank.
+        Each tier is also partitioned up front into the sequences that can run
+        on a single target qubit, so injection never has to reject a draw.
         """
         self.noise_tiers = {
             'light': [s for s in self.full_bank if 2 <= len(s) <= 4],
@@ -39,51 +44,38 @@ class SmartNoiseGenerator:
             if not self.noise_tiers[tier]:
                 self.noise_tiers[tier] = self.full_bank
 
+        self.single_qubit_tiers = {
+            tier: [s for s in bank if not self._requires_multi_qubit(s)]
+            for tier, bank in self.noise_tiers.items()
+        }
+
+    @staticmethod
+    def _requires_multi_qubit(sequence):
+        """Returns True if any gate in the sequence needs two or more qubits."""
+        return any(token.lower().split('(', 1)[0].strip() in MULTI_QUBIT_GATES for token in sequence)
+
     def inject(self, qc, target_qubits, level='medium'):
         """
         Injects a noise sequence into the given quantum circuit.
-        **Version 2: Now with a robust fallback mechanism.**
+        **Version 3: Selects directly from the pre-partitioned banks.**
         """
         if isinstance(target_qubits, int):
             target_qubits = [target_qubits]
 
-        candidate_bank = self.noise_tiers.get(level, self.noise_tiers['light'])
         num_targets = len(target_qubits)
+        tiers = self.noise_tiers if num_targets >= 2 else self.single_qubit_tiers
 
-        # 1. Primary smart selection loop
-        sequence = None
-        for _ in range(50):  # Try up to 50 times
-            candidate_sequence = random.choice(candidate_bank)
-            requires_multi_qubit = any('cx' in g or 'cz' in g or 'swap' in g for g in candidate_sequence)
-
-            if requires_multi_qubit and num_targets < 2:
-                continue  # Skip if sequence needs 2+ qubits but we only have 1
-
-            sequence = candidate_sequence
-            break
-
-        # 2. Robust Fallback Mechanism
-        if sequence is None:
-            # If the primary loop failed, we now guarantee a valid selection from the light tier.
-            fallback_bank = self.noise_tiers['light']
-
-            max_fallback_attempts = 200  # Prevent infinite loops
-            for i in range(max_fallback_attempts):
-                candidate_sequence = random.choice(fallback_bank)
-                requires_multi_qubit = any('cx' in g or 'cz' in g or 'swap' in g for g in candidate_sequence)
-
-                if not requires_multi_qubit or (requires_multi_qubit and num_targets >= 2):
-                    sequence = candidate_sequence
-                    break
+        # 1. Pick from the requested tier, falling back to the light tier
+        candidate_bank = tiers.get(level) or tiers['light']
+        if not candidate_bank:
+            raise RuntimeError(
+                f"NoiseGenerator failed to find a compatible noise sequence for {num_targets} qubit(s). "
+                "Check your 'inverse.json' data bank."
+            )
 
-            # If after all attempts we still fail, raise an error to prevent silent corruption
-            if sequence is None:
-                raise RuntimeError(
-                    f"NoiseGenerator failed to find a compatible noise sequence for {num_targets} qubit(s). "
-                    "Check your 'inverse.json' data bank."
-                )
+        sequence = random.choice(candidate_bank)
 
-        # 3. Apply the guaranteed-to-be-valid noise sequence
+        # 2. Apply the guaranteed-to-be-valid noise sequence
         for token in sequence:
             apply_gate_from_token(qc, token, target_qubits)
 
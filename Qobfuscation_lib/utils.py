@@ -1,30 +1,52 @@
+from __future__ import annotations
+
+import ast
 import json
+import math
+import operator
 import os
-from numpy import pi, exp
-from qiskit import QuantumCircuit
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+# numpy and qiskit are heavy to import and only needed lazily here
+if TYPE_CHECKING:
+    from qiskit import QuantumCircuit
+
+# Path to the directory containing this script (utils.py)
+LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Assume the 'data' directory is a sibling of the 'Qobfuscation_lib' directory
+DATA_DIR = os.path.join(LIB_DIR, '..', 'data')
+
 
+# Data banks read by the obfuscators
+DATA_BANKS = ('cloaked_gates.json', 'delayed_gate.json', 'aux_res.json', 'inverse.json')
+
+
+def _data_file_path(filename):
+    """Returns the path of a data bank file, or raises FileNotFoundError when there is none."""
+    file_path = os.path.join(DATA_DIR, filename)
+
+    # Fallback: if the script is run from the project root, check 'data' there
+    if not os.path.exists(file_path):
+        project_root_data_path = os.path.join('data', filename)
+        if os.path.exists(project_root_data_path):
+            file_path = project_root_data_path
+        else:
+            # If the file cannot be found in either location, raise an error
+            raise FileNotFoundError(f"Data file '{filename}' not found in expected paths.")
+    return file_path
 
+
+@lru_cache(maxsize=None)
 def load_data_from_json(filename):
     """
     Loads a gate data bank from a JSON file.
     Provides error handling and fallback paths for robustness.
+    Results are cached per filename, so the returned data must not be mutated.
     """
     try:
-        # Path to the directory containing this script (utils.py)
-        lib_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Assume the 'data' directory is a sibling of the 'Qobfuscation_lib' directory
-        data_dir = os.path.join(lib_dir, '..', 'data')
-        file_path = os.path.join(data_dir, filename)
-
-        # Fallback: if the script is run from the project root, check 'data' there
-        if not os.path.exists(file_path):
-            project_root_data_path = os.path.join('data', filename)
-            if os.path.exists(project_root_data_path):
-                file_path = project_root_data_path
-            else:
-                # If the file cannot be found in either location, raise an error
-                raise FileNotFoundError(f"Data file '{filename}' not found in expected paths.")
+        file_path = _data_file_path(filename)
 
         # Load JSON contents from the file
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -42,15 +64,95 @@ def load_data_from_json(filename):
         return {} if 'gates' in filename else []
 
 
+@lru_cache(maxsize=1)
+def data_banks_digest():
+    """
+    Digest of the contents of every file in DATA_BANKS, as found by load_data_from_json.
+    It changes whenever a bank is edited, added or removed.
+    """
+    import hashlib
+
+    h = hashlib.blake2b(digest_size=16)
+    for filename in DATA_BANKS:
+        h.update(filename.encode() + b"\0")
+        try:
+            with open(_data_file_path(filename), 'rb') as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b"<missing>")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+
+# Whitelist for angle expressions such as "pi/4", "-pi/2" or "exp(1)"
+def _exp(x):
+    from numpy import exp
+    return exp(x)
+
+
+_ANGLE_NAMES = {"pi": math.pi}
+_ANGLE_FUNCS = {"exp": _exp}
+# No '**': no bank uses it, and an unbounded power such as 9**9**9 would hang the evaluator
+_ANGLE_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_ANGLE_UNARYOPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def _eval_angle_node(node):
+    """Evaluates a parsed angle expression, allowing only whitelisted operations."""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in _ANGLE_NAMES:
+        return _ANGLE_NAMES[node.id]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _ANGLE_UNARYOPS:
+        return _ANGLE_UNARYOPS[type(node.op)](_eval_angle_node(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _ANGLE_BINOPS:
+        return _ANGLE_BINOPS[type(node.op)](_eval_angle_node(node.left), _eval_angle_node(node.right))
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _ANGLE_FUNCS
+            and len(node.args) == 1 and not node.keywords):
+        return _ANGLE_FUNCS[node.func.id](_eval_angle_node(node.args[0]))
+    raise ValueError(f"Unsupported angle expression: {ast.dump(node)}")
+
+
+@lru_cache(maxsize=None)
+def _parse_angle(expr):
+    """Safely evaluates an angle expression without eval()."""
+    return _eval_angle_node(ast.parse(expr, mode='eval').body)
+
+
+# Gate name -> (QuantumCircuit method name, required qubits, needs angle)
+GATE_PROPERTIES = {
+    # Single qubit, non-parameterized
+    'x': ('x', 1, False), 'y': ('y', 1, False), 'z': ('z', 1, False),
+    'h': ('h', 1, False), 's': ('s', 1, False), 'sdg': ('sdg', 1, False),
+    't': ('t', 1, False), 'tdg': ('tdg', 1, False), 'sx': ('sx', 1, False),
+    'sxdg': ('sxdg', 1, False), 'id': ('id', 1, False),
+
+    # Single qubit, parameterized
+    'p': ('p', 1, True), 'rx': ('rx', 1, True), 'ry': ('ry', 1, True),
+    'rz': ('rz', 1, True),
+
+    # Multi-qubit, non-parameterized
+    'cx': ('cx', 2, False), 'cz': ('cz', 2, False), 'swap': ('swap', 2, False),
+    'ccx': ('ccx', 3, False), 'cswap': ('cswap', 3, False),
+
+    # Multi-qubit, parameterized
+    'cp': ('cp', 2, True),
+    'crx': ('crx', 2, True), 'cry': ('cry', 2, True), 'crz': ('crz', 2, True),
+    'rxx': ('rxx', 2, True), 'ryy': ('ryy', 2, True), 'rzz': ('rzz', 2, True),
+}
+
 
 #"rx(pi/4)" or "cx" to
 
-def apply_gate_from_token(qc, token, qubits_indices):
+@lru_cache(maxsize=None)
+def _parse_gate_token(token):
     """
-    Parses a text token and applies the corresponding gate to the QuantumCircuit.
-    Enhanced:
-      - Supports parameterized and multi-qubit gates.
-      - Randomly chooses target qubits from `qubits_indices` (not always the first).
+    Parses a text token into a (name, angle) pair, or None if it is malformed.
+    Results are memoized, since the data banks reuse the same tokens heavily.
     """
     token = token.lower().strip()
     name = token
@@ -61,40 +163,36 @@ def apply_gate_from_token(qc, token, qubits_indices):
         try:
             name, arg_str = token.split('(', 1)
             arg_str = arg_str[:-1]  # remove ')'
-            angle = eval(arg_str, {"__builtins__": None}, {"pi": pi, "exp": exp})
+            angle = _parse_angle(arg_str)
         except Exception:
-            return
-
-    GATE_PROPERTIES = {
-        # Single qubit, non-parameterized
-        'x': (qc.x, 1, False), 'y': (qc.y, 1, False), 'z': (qc.z, 1, False),
-        'h': (qc.h, 1, False), 's': (qc.s, 1, False), 'sdg': (qc.sdg, 1, False),
-        't': (qc.t, 1, False), 'tdg': (qc.tdg, 1, False), 'sx': (qc.sx, 1, False),
-        'sxdg': (qc.sxdg, 1, False), 'id': (qc.id, 1, False),
-
-        # Single qubit, parameterized
-        'p': (qc.p, 1, True), 'rx': (qc.rx, 1, True), 'ry': (qc.ry, 1, True),
-        'rz': (qc.rz, 1, True),
-
-        # Multi-qubit, non-parameterized
-        'cx': (qc.cx, 2, False), 'cz': (qc.cz, 2, False), 'swap': (qc.swap, 2, False),
-        'ccx': (qc.ccx, 3, False), 'cswap': (qc.cswap, 3, False),
-
-        # Multi-qubit, parameterized
-        'cp': (qc.cp, 2, True),
-        'crx': (qc.crx, 2, True), 'cry': (qc.cry, 2, True), 'crz': (qc.crz, 2, True),
-        'rxx': (qc.rxx, 2, True), 'ryy': (qc.ryy, 2, True), 'rzz': (qc.rzz, 2, True),
-    }
-
-    if name not in GATE_PROPERTIES:
+            return None
+
+    return name, angle
+
+
+def apply_gate_from_token(qc, token, qubits_indices):
+    """
+    Parses a text token and applies the corresponding gate to the QuantumCircuit.
+    Enhanced:
+      - Supports parameterized and multi-qubit gates.
+      - Randomly chooses target qubits from `qubits_indices` (not always the first).
+    """
+    parsed = _parse_gate_token(token)
+    if parsed is None:
+        return
+    name, angle = parsed
+
+    spec = GATE_PROPERTIES.get(name)
+    if spec is None:
         return
 
-    gate_func, required_qubits, needs_angle = GATE_PROPERTIES[name]
+    method_name, required_qubits, needs_angle = spec
 
     if len(qubits_indices) < required_qubits:
         return
 
     q_args = qubits_indices[:required_qubits]
+    gate_func = getattr(qc, method_name)
 
     try:
         if needs_angle:
@@ -123,11 +221,14 @@ def export_circuit_to_py(qc: QuantumCircuit, func_name="build_obfuscated_circuit
         f"    qc = qiskit.QuantumCircuit({qc.num_qubits}, {qc.num_clbits}, name='{circuit_name}')\n"
     ]
 
+    qubit_to_idx = {q: i for i, q in enumerate(qc.qubits)}
+    clbit_to_idx = {c: i for i, c in enumerate(qc.clbits)}
+
     # Iterate through the circuit's operations and recreate them
     for instruction in qc.data:
         gate_name = instruction.operation.name
-        qubits = [qc.qubits.index(q) for q in instruction.qubits]
-        clbits = [qc.clbits.index(c) for c in instruction.clbits]
+        qubits = [qubit_to_idx[q] for q in instruction.qubits]
+        clbits = [clbit_to_idx[c] for c in instruction.clbits]
         params = instruction.operation.params
 
         # Format parameters as Python code strings
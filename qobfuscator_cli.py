@@ -1,39 +1,113 @@
 # -*- coding: utf-8 -*-
-import argparse
 import os
+import re
 import sys
-from rich.console import Console
+from functools import lru_cache
+from types import MappingProxyType, SimpleNamespace
 
-# Add the library path to Python's search paths to ensure modules can be imported
+# Make sure the project root (home of the 'Qobfuscation_lib' package) is searched first.
+# When run as a script it already is sys.path[0], so nothing is added in the common case.
 script_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(script_dir)
-
-# Initialize Rich Console
-console = Console()
-
-try:
-    from Qobfuscation_lib.circuit_obfuscator import CircuitObfuscator
-    from Qobfuscation_lib.classical_obfuscator import obfuscate_file as obfuscate_classical_file
-    from Qobfuscation_lib.banner import animated_banner
-except ImportError as e:
-    console.print(f"❌ [bold red]Error:[/bold red] 'Qobfuscation_lib' library was not found.")
-    console.print(f"   [yellow]Hint:[/yellow] Please ensure this script is located in the project root directory, alongside 'Qobfuscation_lib'.")
-    console.print(f"   [yellow]Details:[/yellow] {e}")
-    sys.exit(1)
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
 
+# Rich markup tags such as [bold red] or [/yellow]; literal brackets like "[*]" are left alone
+_MARKUP_TAG = re.compile(r"\[[a-z#/@][^\[\]]*\]")
 
-def main():
+
+class _Literal(str):
+    """Text the plain console writes as is, without stripping markup-like tags."""
+
+
+class _PlainConsole:
+    """Minimal stand-in for rich's Console that writes untagged text straight to stdout."""
+
+    def print(self, *objects, sep=" ", end="\n"):
+        sys.stdout.write(sep.join(obj if isinstance(obj, _Literal) else _MARKUP_TAG.sub("", str(obj))
+                                  for obj in objects) + end)
+
+
+def _get_console():
+    """Returns a Rich Console on an interactive terminal, otherwise a plain text writer."""
+    if not sys.stdout.isatty() or "NO_COLOR" in os.environ:
+        return _PlainConsole()
+    from rich.console import Console
+    return Console()
+
+
+# Initialize the console (Rich only when the output is an interactive terminal)
+console = _get_console()
+
+# Message prefixes shared by the error/warning output
+_ERROR = "❌ [bold red]Error:[/bold red] "
+_VALIDATION_ERROR = "❌ [bold red]Validation Error:[/bold red] "
+_WARNING = "⚠️ [bold yellow]Warning:[/bold yellow] "
+_HINT = "   [yellow]Hint:[/yellow] "
+_DETAILS = "   [yellow]Details:[/yellow] "
+_QUANTUM_ALGOS_HINT = "   [yellow]Hint: Available quantum algorithms are:[/yellow] "
+_CLASSICAL_ALGOS_HINT = "   [yellow]Hint: Available classical algorithms are:[/yellow] "
+# Message templates; the '{}' is filled with a user-supplied value by _emit_template
+_NOT_QUANTUM = "Algorithm '{}' is not a valid QUANTUM algorithm."
+_NOT_CLASSICAL = "Algorithm '{}' is not a valid CLASSICAL algorithm."
+_BATCH_UNREADABLE = "Batch file '{}' could not be read."
+_BATCH_EMPTY = "No files listed in batch file '{}'."
+_FILE_MISSING = "File '{}' does not exist."
+_ONE_CLASSICAL_ALGO = ("Classical obfuscation supports only one algorithm at a time. "
+                       "Only the first algorithm will be applied.")
+
+
+@lru_cache(maxsize=None)
+def _resolve_prefix(prefix):
+    """Resolves a markup prefix once: a rich Text for a Rich console, plain text otherwise."""
+    if isinstance(console, _PlainConsole):
+        return _MARKUP_TAG.sub("", prefix)
+    from rich.text import Text
+    return Text.from_markup(prefix)
+
+
+def _literal(text, style=""):
+    """Wraps user-supplied text (paths, names) so it is printed verbatim, never parsed as markup."""
+    if isinstance(console, _PlainConsole):
+        return _Literal(text)
+    from rich.text import Text
+    return Text(text, style=style)
+
+
+def _emit(prefix, *parts, markup=True):
     """
-    Main function to run the obfuscation tool from the command line.
-    Provides support for both quantum circuit obfuscation and classical script obfuscation.
+    Prints `parts` after a cached prefix. String parts are markup unless markup=False;
+    parts built with _literal() are always printed as is.
     """
-    # Display the professional animated banner at startup
-    animated_banner()
+    head = _resolve_prefix(prefix)
+    if isinstance(head, str):
+        sys.stdout.write(head + "".join(part if isinstance(part, _Literal) or not markup
+                                        else _MARKUP_TAG.sub("", part) for part in parts) + "\n")
+    else:
+        from rich.text import Text
+        line = head.copy()
+        for part in parts:
+            if not isinstance(part, Text):
+                part = Text.from_markup(part) if markup else Text(part)
+            line.append_text(part)
+        console.print(line)
 
-    parser = argparse.ArgumentParser(
-        description="tool for obfuscating quantum circuits and classical scripts.",
-        formatter_class=argparse.RawTextHelpFormatter,
-        epilog="""
+
+def _emit_template(prefix, template, value, style="bold"):
+    """Prints a message template after `prefix`, with its single '{}' replaced by the literal `value`."""
+    before, after = template.split("{}", 1)
+    _emit(prefix, before, _literal(value, style), after)
+
+
+# Algorithms accepted by each mode; the tuples keep the order used in hints
+QUANTUM_ALGOS = ('cloaked', 'inverse', 'delayed', 'composite')
+CLASSICAL_ALGOS = ('simple_entanglement', 'variable_pairs', 'shroud', 'deterministic')
+VALID_QUANTUM_ALGOS = frozenset(QUANTUM_ALGOS)
+VALID_CLASSICAL_ALGOS = frozenset(CLASSICAL_ALGOS)
+_QUANTUM_HINT = ", ".join(QUANTUM_ALGOS)
+_CLASSICAL_HINT = ", ".join(CLASSICAL_ALGOS)
+
+# Help epilog shown by --help
+_EPILOG = """
 Usage examples:
 -----------------
 1. Quantum obfuscation of a QASM file using the 'cloaked' algorithm:
@@ -46,16 +120,55 @@ Usage examples:
         python qobfuscator_cli.py -c -f my_script.py -a simple_entanglement
 
 Available algorithms:
-- Quantum (-q): cloaked, inverse, delayed, composite
-- Classical (-c): simple_entanglement, variable_pairs, shroud, deterministic
-"""
+- Quantum (-q): {quantum}
+- Classical (-c): {classical}
+""".format(quantum=_QUANTUM_HINT, classical=_CLASSICAL_HINT)
+
+# Startup announcement, printed in a single call around the (literal) file path
+_STARTUP_HEAD = "\n[*] [bold bright_blue]Starting obfuscation[/bold bright_blue] for file: "
+_STARTUP_TAIL_TMPL = (
+    "\n[*] [bold bright_cyan]Obfuscation type:[/bold bright_cyan] {kind}\n"
+    "[*] [bold magenta]{algo_label}:[/bold magenta] {algos}"
+)
+
+
+def _library_missing(e):
+    """Reports a failed 'Qobfuscation_lib' import and exits."""
+    _emit(_ERROR, "'Qobfuscation_lib' library was not found.")
+    _emit(_HINT, "Please ensure this script is located in the project root directory, alongside 'Qobfuscation_lib'.")
+    _emit(_DETAILS, str(e), markup=False)
+    sys.exit(1)
+
+
+@lru_cache(maxsize=1)
+def _build_parser():
+    """
+    Builds the full argparse parser, used for --help and anything the fast scanner rejects.
+    Built at most once per process and shared by later calls.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="tool for obfuscating quantum circuits and classical scripts.",
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=_EPILOG
     )
 
     # --- File input and general settings ---
-    parser.add_argument('-f', '--file', required=True,
-                        help='Path to the file to be obfuscated (.qasm or .py).')
+    file_input = parser.add_mutually_exclusive_group(required=True)
+    file_input.add_argument('-f', '--file',
+                            help='Path to the file to be obfuscated (.qasm or .py).')
+    file_input.add_argument('--batch', metavar='FILE',
+                            help='Path to a text file listing one file to obfuscate per line.\n'
+                                 'The libraries and obfuscator are set up once for all of them.')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Enable verbose mode to display detailed information during execution.')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse the stored result of an earlier run on identical input and algorithms,\n'
+                             'and store new results (in $XDG_CACHE_HOME/qobfuscator or ~/.cache/qobfuscator).')
+    parser.add_argument('--no-banner', action='store_true',
+                        help='Do not show the animated banner (also skipped when output is not a terminal\n'
+                             'or QOBF_NO_BANNER is set).')
 
     # --- Obfuscation type selection (Quantum or Classical) ---
     obfuscation_type = parser.add_mutually_exclusive_group(required=True)
@@ -65,66 +178,305 @@ Available algorithms:
                                   help='Apply obfuscation at the classical script level (code wrapping).')
 
     # --- Algorithm selection ---
-    parser.add_argument('-a', '--algo', required=True, action='append',
-                        help='Name of the obfuscation algorithm to apply. '
+    parser.add_argument('-a', '--algo', required=True, action='extend', nargs='+',
+                        help='Name(s) of the obfuscation algorithm(s) to apply, e.g. -a cloaked inverse.\n'
                              'Can be specified multiple times for multi-layer quantum obfuscation.')
+    return parser
 
-    args = parser.parse_args()
-    # --- ADD THIS VALIDATION BLOCK ---
-    VALID_QUANTUM_ALGOS = ['cloaked', 'inverse', 'delayed', 'composite']
-    VALID_CLASSICAL_ALGOS = ['simple_entanglement', 'variable_pairs', 'shroud', 'deterministic']
 
-    if args.quantum:
-        for algo in args.algo:
-            if algo not in VALID_QUANTUM_ALGOS:
-                console.print(
-                    f"❌ [bold red]Validation Error:[/bold red] Algorithm '[bold]{algo}[/bold]' is not a valid QUANTUM algorithm.")
-                console.print(
-                    f"   [yellow]Hint: Available quantum algorithms are:[/yellow] {', '.join(VALID_QUANTUM_ALGOS)}")
-                return  # Exit the program
+# Options understood by the fast argv scanner: flag -> destination
+_FLAG_OPTIONS = {
+    '-v': 'verbose', '--verbose': 'verbose',
+    '--no-banner': 'no_banner',
+    '--cache': 'cache',
+    '-q': 'quantum', '--quantum': 'quantum',
+    '-c': 'classical', '--classical': 'classical',
+}
+_VALUE_OPTIONS = {'-f': 'file', '--file': 'file', '--batch': 'batch', '-a': 'algo', '--algo': 'algo'}
 
-    elif args.classical:
-        if args.algo[0] not in VALID_CLASSICAL_ALGOS:
-            console.print(
-                f"❌ [bold red]Validation Error:[/bold red] Algorithm '[bold]{args.algo[0]}[/bold]' is not a valid CLASSICAL algorithm.")
-            console.print(
-                f"   [yellow]Hint: Available classical algorithms are:[/yellow] {', '.join(VALID_CLASSICAL_ALGOS)}")
-            return  # Exit the program
-    # --- Validate that the target file exists ---
-    if not os.path.exists(args.file):
-        console.print(f"❌ [bold red]Error:[/bold red] File '[bold]{args.file}[/bold]' does not exist.")
-        return
 
-    console.print(f"\n[*] [bold bright_blue]Starting obfuscation[/bold bright_blue] for file: [white]{args.file}[/white]")
+def _scan_argv(argv):
+    """
+    Single pass over the common command-line forms, without building a parser.
+    Returns None for anything unusual (help, errors, combined flags, ...) so that
+    argparse can handle it with its usual messages.
+    """
+    values = {'file': None, 'batch': None, 'verbose': False, 'no_banner': False, 'cache': False,
+              'quantum': False, 'classical': False, 'algo': []}
+    i, n = 0, len(argv)
+    while i < n:
+        arg = argv[i]
+        dest = _FLAG_OPTIONS.get(arg)
+        if dest is not None:
+            values[dest] = True
+            i += 1
+            continue
 
-    # --- Quantum obfuscation logic ---
-    if args.quantum:
-        console.print(f"[*] [bold bright_cyan]Obfuscation type:[/bold bright_cyan] Quantum Circuit Obfuscation")
-        console.print(f"[*] [bold magenta]Applied algorithms:[/bold magenta] {', '.join(args.algo)}")
+        dest = _VALUE_OPTIONS.get(arg)
+        if dest is None or i + 1 == n or argv[i + 1].startswith('-'):
+            return None
+        if dest == 'algo':
+            # -a takes one or more names, up to the next option
+            j = i + 1
+            while j < n and not argv[j].startswith('-'):
+                j += 1
+            values['algo'].extend(argv[i + 1:j])
+            i = j
+        else:
+            values[dest] = argv[i + 1]
+            i += 2
+
+    if ((values['file'] is None) == (values['batch'] is None) or not values['algo']
+            or values['quantum'] == values['classical']):
+        return None
+    return SimpleNamespace(**values)
+
+
+def _parse_args(argv):
+    """Parses the command line, falling back to argparse whenever the fast scanner gives up."""
+    args = _scan_argv(argv)
+    if args is None:
+        args = _build_parser().parse_args(argv)
+    return args
+
+
+# Shared read-only config for techniques run with their defaults
+_EMPTY_CFG = MappingProxyType({})
+
+
+@lru_cache(maxsize=None)
+def _techniques(algos):
+    """Techniques as (name, config) tuples for CircuitObfuscator.obfuscate, built once per algo tuple."""
+    return tuple((algo_name, _EMPTY_CFG) for algo_name in algos)
 
-        # Prepare list of techniques as tuples (name, config_dict)
-        techniques = [(algo_name, {}) for algo_name in args.algo]
 
+# Persistent store of earlier results, used with --cache
+_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                          'qobfuscator')
+_CACHED_RESULT = "[*] [bold green]Reused cached result:[/bold green] "
+
+
+def _cache_key(mode, path, algos):
+    """
+    Key for a result: hash of the input bytes, its file name and the mode/algorithms applied,
+    plus the library version and the data banks, so an upgrade or a bank edit misses the cache.
+    """
+    import hashlib
+    from Qobfuscation_lib import __version__
+    from Qobfuscation_lib.utils import data_banks_digest
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.read())
+    h.update(repr((mode, os.path.basename(path), tuple(algos), __version__, data_banks_digest())).encode())
+    return h.hexdigest()
+
+
+def _cache_restore(key, output_path):
+    """Copies a cached result to output_path. Returns False when there is none."""
+    import shutil
+
+    try:
+        shutil.copyfile(os.path.join(_CACHE_DIR, key), output_path)
+    except OSError:
+        return False
+    return True
+
+
+def _cache_store(key, output_path):
+    """
+    Stores a fresh result; a cache that cannot be written is simply skipped.
+    The copy goes to a temporary file that is renamed into place, so an interrupted
+    store never leaves a truncated entry behind.
+    """
+    import shutil
+    import tempfile
+
+    tmp_path = None
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, prefix=f".{key}.", suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(output_path, tmp_path)
+        os.replace(tmp_path, os.path.join(_CACHE_DIR, key))
+        tmp_path = None
+    except OSError:
+        pass
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _report_failure(mode, e, verbose):
+    """Reports a failed obfuscation once: the exception type and message, plus the traceback when verbose."""
+    _emit(f"❌ [bold red]Unexpected error occurred during {mode} obfuscation:[/bold red] ",
+          f"{type(e).__name__}: {e}", markup=False)
+    if verbose:
+        import traceback
+        sys.stdout.write(traceback.format_exc())
+
+
+def _run_quantum(args, targets):
+    """
+    Applies the requested quantum obfuscation layers to each (path, stat) target.
+    Returns the number of targets that failed.
+    """
+    techniques = _techniques(tuple(args.algo))
+
+    try:
+        from Qobfuscation_lib.circuit_obfuscator import CircuitObfuscator
+    except ImportError as e:
+        _library_missing(e)
+
+    startup_tail = _STARTUP_TAIL_TMPL.format(kind="Quantum Circuit Obfuscation",
+                                             algo_label="Applied algorithms", algos=", ".join(args.algo))
+    obfuscator = None
+    failures = 0
+    for path, _ in targets:
+        console.print(_STARTUP_HEAD, _literal(path, "white"), startup_tail, sep="")
         try:
-            obfuscator = CircuitObfuscator(verbose=args.verbose)
-            obfuscator.obfuscate(args.file, techniques)
+            key = _cache_key('quantum', path, args.algo) if args.cache else None
+            output_path = CircuitObfuscator.output_path_for(path)
+            if key and _cache_restore(key, output_path):
+                _emit(_CACHED_RESULT, _literal(output_path))
+                continue
+            if obfuscator is None:
+                obfuscator = CircuitObfuscator(verbose=args.verbose)
+            # obfuscate() reports its own errors and returns None instead of raising
+            if not obfuscator.obfuscate(path, techniques):
+                failures += 1
+                continue
+            if key:
+                _cache_store(key, output_path)
         except Exception as e:
-            console.print(f"❌ [bold red]Unexpected error occurred during quantum obfuscation:[/bold red] {e}")
+            _report_failure("quantum", e, args.verbose)
+            failures += 1
+    return failures
+
+
+def _run_classical(args, targets):
+    """
+    Wraps each (path, stat) target in the requested classical obfuscation template.
+    Returns the number of targets that failed.
+    """
+    algo_name = args.algo[0]
+
+    try:
+        from Qobfuscation_lib.classical_obfuscator import obfuscate_file as obfuscate_classical_file, output_path_for
+    except ImportError as e:
+        _library_missing(e)
+
+    startup_tail = _STARTUP_TAIL_TMPL.format(kind="Classical Script Obfuscation",
+                                             algo_label="Applied algorithm", algos=algo_name)
+    failures = 0
+    for path, file_stat in targets:
+        console.print(_STARTUP_HEAD, _literal(path, "white"), startup_tail, sep="")
+        try:
+            key = _cache_key('classical', path, args.algo) if args.cache else None
+            output_path = output_path_for(path, algo_name)
+            if key and _cache_restore(key, output_path):
+                _emit(_CACHED_RESULT, _literal(output_path))
+                continue
+            obfuscate_classical_file(path, algo_name, return_text=False, stat_result=file_stat)
+            if key:
+                _cache_store(key, output_path)
+        except Exception as e:
+            _report_failure("classical", e, args.verbose)
+            failures += 1
+    return failures
+
+
+# Obfuscation mode -> handler(args, targets) returning the number of failed targets
+_HANDLERS = {
+    'quantum': _run_quantum,
+    'classical': _run_classical,
+}
+
+
+def _show_banner(args):
+    """Displays the professional animated banner, but only for interactive runs."""
+    if args.no_banner or not sys.stdout.isatty() or os.environ.get('QOBF_NO_BANNER'):
+        return
+    try:
+        from Qobfuscation_lib.banner import animated_banner
+    except ImportError as e:
+        _library_missing(e)
+    animated_banner()
+
+
+def _validate_algos(args):
+    """Checks the requested algorithms for the chosen mode. Returns False after reporting a bad one."""
+    if args.quantum:
+        bad = [algo for algo in args.algo if algo not in VALID_QUANTUM_ALGOS]
+        if bad:
+            _emit_template(_VALIDATION_ERROR, _NOT_QUANTUM, bad[0])
+            _emit(_QUANTUM_ALGOS_HINT, _QUANTUM_HINT)
+            return False
 
-    # --- Classical obfuscation logic ---
     elif args.classical:
+        # Only the first algorithm is ever used, so drop the rest right away
         if len(args.algo) > 1:
-            console.print("⚠️ [bold yellow]Warning:[/bold yellow] Classical obfuscation supports only one algorithm at a time. "
-                          "Only the first algorithm will be applied.")
+            _emit(_WARNING, _ONE_CLASSICAL_ALGO)
+            args.algo = args.algo[:1]
+        if args.algo[0] not in VALID_CLASSICAL_ALGOS:
+            _emit_template(_VALIDATION_ERROR, _NOT_CLASSICAL, args.algo[0])
+            _emit(_CLASSICAL_ALGOS_HINT, _CLASSICAL_HINT)
+            return False
+    return True
+
 
-        algo_name = args.algo[0]
-        console.print(f"[*] [bold bright_cyan]Obfuscation type:[/bold bright_cyan] Classical Script Obfuscation")
-        console.print(f"[*] [bold magenta]Applied algorithm:[/bold magenta] {algo_name}")
+def _collect_targets(args):
+    """
+    Returns the (path, stat) pairs to obfuscate (the single -f file or every line of the
+    --batch list) and the number of entries that could not be used. Missing files are
+    reported and left out; an unreadable or empty batch list counts as one failure.
+    """
+    if args.batch is not None:
+        try:
+            with open(args.batch, "r", encoding="utf-8") as f:
+                paths = [line.strip() for line in f if line.strip()]
+        except (OSError, ValueError):
+            _emit_template(_ERROR, _BATCH_UNREADABLE, args.batch)
+            return [], 1
+        if not paths:
+            _emit_template(_ERROR, _BATCH_EMPTY, args.batch)
+            return [], 1
+    else:
+        paths = [args.file]
 
+    # One stat() call each; the result is handed on so the obfuscator need not check again
+    targets = []
+    missing = 0
+    for path in paths:
         try:
-            obfuscate_classical_file(args.file, algo_name)
-        except Exception as e:
-            console.print(f"❌ [bold red]Unexpected error occurred during classical obfuscation:[/bold red] {e}")
+            targets.append((path, os.stat(path)))
+        except (OSError, ValueError):
+            _emit_template(_ERROR, _FILE_MISSING, path)
+            missing += 1
+    return targets, missing
+
+
+def main():
+    """
+    Main function to run the obfuscation tool from the command line.
+    Provides support for both quantum circuit obfuscation and classical script obfuscation.
+    """
+    args = _parse_args(sys.argv[1:])
+    _show_banner(args)
+
+    # An unknown algorithm is a usage error, reported with argparse's exit status
+    if not _validate_algos(args):
+        sys.exit(2)
+    targets, failures = _collect_targets(args)
+
+    # Hand over to the obfuscation mode's handler; missing or failed targets give a non-zero exit status
+    if targets:
+        failures += _HANDLERS['quantum' if args.quantum else 'classical'](args, targets)
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
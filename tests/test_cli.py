@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qobfuscator_cli.py")
+
+
+def run_cli(*argv, cwd):
+    env = dict(os.environ, QOBF_NO_BANNER="1")
+    return subprocess.run([sys.executable, CLI, *argv], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+
+
+@pytest.mark.parametrize("mode, algo", [("-q", "cloakd"), ("-c", "shrod")])
+def test_invalid_algorithm_exits_with_usage_error(tmp_path, mode, algo):
+    target = tmp_path / "target.py"
+    target.write_text("print('hello')\n")
+
+    result = run_cli(mode, "-f", str(target), "-a", algo, cwd=tmp_path)
+
+    assert result.returncode == 2
+    assert f"Algorithm '{algo}' is not a valid" in result.stdout
+    assert list(tmp_path.iterdir()) == [target]
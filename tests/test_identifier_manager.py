@@ -0,0 +1,26 @@
+import random
+
+from Qobfuscation_lib.identifier_manager import IdentifierManager
+
+
+POINT_SRC = '''
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+def dist(p: Point, q: Point) -> Point:
+    return Point(p.x - q.x, p.y - q.y)
+
+result = dist(Point(3, 4), Point(1, 1)).x
+'''
+
+
+def test_argument_annotations_are_renamed():
+    random.seed(1)
+    renamed = IdentifierManager().rename_identifiers(POINT_SRC)
+
+    assert "Point" not in renamed
+    namespace = {}
+    exec(renamed, namespace)
+    assert 2 in namespace.values()
@@ -0,0 +1,22 @@
+import math
+
+import pytest
+
+from Qobfuscation_lib.utils import _parse_angle, _parse_gate_token
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("pi/4", math.pi / 4), ("-pi/2", -math.pi / 2), ("2*pi - 1", 2 * math.pi - 1),
+])
+def test_angle_expressions_are_evaluated(expr, expected):
+    assert _parse_angle(expr) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("expr", ["9**9**9", "pi**2", "__import__('os')", "pi.real"])
+def test_angle_evaluator_rejects_unsupported_expressions(expr):
+    with pytest.raises(ValueError):
+        _parse_angle(expr)
+
+
+def test_gate_token_with_power_is_malformed():
+    assert _parse_gate_token("rx(9**9**9)") is None